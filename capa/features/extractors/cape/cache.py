@@ -0,0 +1,163 @@
+# Copyright (C) 2024 Mandiant, Inc. All Rights Reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at: [package root]/LICENSE.txt
+# Unless required by applicable law or agreed to in writing, software distributed under the License
+#  is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and limitations under the License.
+import os
+import zlib
+import pickle
+import hashlib
+import logging
+from typing import Optional
+from pathlib import Path
+from dataclasses import dataclass
+
+import capa.version
+from capa.features.extractors.cape.models import CapeReport
+
+logger = logging.getLogger(__name__)
+
+
+# TypeAlias. note: using `foo: TypeAlias = bar` is Python 3.10+
+CacheIdentifier = str
+
+
+def compute_cache_identifier(path: Path) -> CacheIdentifier:
+    """
+    compute the cache identifier for the raw (possibly compressed) report at the given path.
+    """
+    hash = hashlib.sha256()
+
+    # note that this changes with each release,
+    # so cache identifiers will never collide across releases (and their report models).
+    version = capa.version.__version__
+
+    hash.update(version.encode("utf-8"))
+    hash.update(b"\x00")
+
+    # hash the report incrementally, since it may be hundreds of megabytes.
+    with path.open("rb") as f:
+        while chunk := f.read(0x100000):
+            hash.update(chunk)
+
+    return hash.hexdigest()
+
+
+def get_cache_path(cache_dir: Path, id: CacheIdentifier) -> Path:
+    filename = "cape-" + id[:16] + ".cache"
+    return cache_dir / filename
+
+
+MAGIC = b"cape"
+VERSION = b"\x00\x00\x00\x01"
+
+
+@dataclass
+class ReportCache:
+    id: CacheIdentifier
+    report: CapeReport
+
+    def dump(self):
+        return (
+            MAGIC
+            + VERSION
+            + self.id.encode("ascii")
+            + zlib.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+        )
+
+    @staticmethod
+    def load(data):
+        assert data.startswith(MAGIC + VERSION)
+
+        id = data[0x8:0x48].decode("ascii")
+        cache = pickle.loads(zlib.decompress(data[0x48:]))
+
+        assert isinstance(cache, ReportCache)
+        assert cache.id == id
+
+        return cache
+
+
+def load_cached_report(cache_dir: Path, id: CacheIdentifier) -> Optional[CapeReport]:
+    path = get_cache_path(cache_dir, id)
+    if not path.exists():
+        logger.debug("report cache does not exist: %s", path)
+        return None
+
+    logger.debug("loading report from cache: %s", path)
+    buf = path.read_bytes()
+
+    try:
+        cache = ReportCache.load(buf)
+    except (
+        AssertionError,
+        # truncated or otherwise corrupt data.
+        zlib.error,
+        EOFError,
+        pickle.UnpicklingError,
+        # stale data, such as pickled classes that have since been renamed or changed.
+        AttributeError,
+        ImportError,
+        TypeError,
+        ValueError,
+    ):
+        logger.debug("report cache is invalid: %s", path)
+        # delete the cache that seems to be invalid.
+        path.unlink()
+        return None
+    else:
+        return cache.report
+
+
+def cache_report(cache_dir: Path, id: CacheIdentifier, report: CapeReport):
+    path = get_cache_path(cache_dir, id)
+    if path.exists():
+        logger.debug("report already cached to %s", path)
+        return
+
+    # write to a temporary file and then move it into place,
+    # so that an interrupted write never leaves a partial cache entry behind,
+    # and concurrent readers only ever see complete entries.
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp_path.write_bytes(ReportCache(id, report).dump())
+        tmp_path.replace(path)
+    except OSError as e:
+        # the cache is an optimization, so don't fail the analysis when it can't be written,
+        # such as when the cache directory is read-only or the disk is full.
+        logger.warning("failed to cache report to %s: %s", path, e)
+        return
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    logger.debug("report cached to %s", path)
+    return
+
+
+def load_report(path: Path, cache_dir: Path) -> CapeReport:
+    """
+    load the (optionally gzip-compressed) CAPE report at the given path,
+    using the validated report cached in the given directory, when available.
+
+    subsequent loads of the same report skip decompression, JSON parsing, and validation,
+    though the report file is still hashed to find its cache entry.
+    """
+    id = compute_cache_identifier(path)
+
+    report = load_cached_report(cache_dir, id)
+    if report is not None:
+        return report
+
+    report = CapeReport.from_path(path)
+
+    # calls are validated lazily, upon first access (see LazyCallList),
+    # so validate them all now, so that the cache holds validated calls rather than the raw data.
+    for process in report.behavior.processes:
+        for _ in process.calls:
+            pass
+
+    cache_report(cache_dir, id, report)
+    return report
@@ -7,10 +7,12 @@
 # See the License for the specific language governing permissions and limitations under the License.
 
 import logging
-from typing import Dict, Tuple, Union, Iterator
+from typing import Dict, Tuple, Union, Iterator, Optional
+from pathlib import Path
 
 import capa.features.extractors.cape.call
 import capa.features.extractors.cape.file
+import capa.features.extractors.cape.cache
 import capa.features.extractors.cape.thread
 import capa.features.extractors.cape.global_
 import capa.features.extractors.cape.process
@@ -123,8 +125,21 @@ class CapeExtractor(DynamicFeatureExtractor):
 
     @classmethod
     def from_report(cls, report: Dict) -> "CapeExtractor":
-        cr = CapeReport.model_validate(report)
+        return cls.from_cape_report(CapeReport.from_dict(report))
 
+    @classmethod
+    def from_path(cls, path: Path, cache_dir: Optional[Path] = None) -> "CapeExtractor":
+        """
+        when `cache_dir` is provided, the validated report is cached there,
+        keyed by the SHA-256 of the report file, and reused on subsequent runs.
+        """
+        if cache_dir is None:
+            return cls.from_cape_report(CapeReport.from_path(path))
+
+        return cls.from_cape_report(capa.features.extractors.cape.cache.load_report(path, cache_dir))
+
+    @classmethod
+    def from_cape_report(cls, cr: CapeReport) -> "CapeExtractor":
         if cr.info.version not in TESTED_VERSIONS:
             logger.warning("CAPE version '%s' not tested/supported yet", cr.info.version)
 
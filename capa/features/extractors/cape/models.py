@@ -5,29 +5,77 @@
 # Unless required by applicable law or agreed to in writing, software distributed under the License
 #  is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and limitations under the License.
-import binascii
-from typing import Any, Dict, List, Union, Literal, Optional
-
-from pydantic import Field, BaseModel, ConfigDict
+import os
+import sys
+import array
+import dataclasses
+from typing import (
+    Any,
+    Dict,
+    List,
+    Type,
+    Tuple,
+    Union,
+    Literal,
+    Iterable,
+    Iterator,
+    Optional,
+    Protocol,
+    Sequence,
+    FrozenSet,
+    NamedTuple,
+)
+from pathlib import Path
+from dataclasses import dataclass
+
+from pydantic import Field, BaseModel, ConfigDict, PlainSerializer, GetCoreSchemaHandler
+from pydantic_core import CoreSchema, core_schema
 from typing_extensions import Annotated, TypeAlias
-from pydantic.functional_validators import BeforeValidator
+from pydantic.functional_validators import AfterValidator, PlainValidator
+
+import capa.helpers
 
 
-def validate_hex_int(value):
+def validate_hex_int(value) -> int:
     if isinstance(value, str):
         return int(value, 16) if value.startswith("0x") else int(value, 10)
+    elif isinstance(value, int):
+        # coerce bools, which are ints, too.
+        return int(value)
+    elif isinstance(value, float) and value.is_integer():
+        return int(value)
     else:
-        return value
+        raise ValueError(f"expected an integer or hex string, not: {type(value).__name__}")
+
 
+def validate_hex_bytes(value) -> bytes:
+    if isinstance(value, str):
+        # fields like ep_bytes are often empty, so skip decoding those.
+        return bytes.fromhex(value) if value else b""
+    elif isinstance(value, bytes):
+        return value
+    else:
+        raise ValueError(f"expected bytes or a hex string, not: {type(value).__name__}")
 
-def validate_hex_bytes(value):
-    return binascii.unhexlify(value) if isinstance(value, str) else value
 
+# these are plain validators, rather than "before" validators,
+# so that pydantic doesn't invoke its own int/bytes validation on the converted value, too.
+# so, the validators must handle (and reject) all the possible input types themselves.
+HexInt = Annotated[int, PlainValidator(validate_hex_int)]
+HexBytes = Annotated[bytes, PlainValidator(validate_hex_bytes)]
 
-HexInt = Annotated[int, BeforeValidator(validate_hex_int)]
-HexBytes = Annotated[bytes, BeforeValidator(validate_hex_bytes)]
+# use this for strings that repeat many times throughout a report,
+# like API names, so that each occurrence shares the same object.
+# interned strings are freed once they're no longer referenced,
+# so this doesn't grow without bound.
+InternedStr = Annotated[str, AfterValidator(sys.intern)]
 
 
+# building the validators for the report models is relatively expensive,
+# so the models use `defer_build` to postpone this until they're first used,
+# rather than paying the cost whenever this module is imported
+# (such as when capa analyzes a file that isn't a CAPE report).
+#
 # a model that *cannot* have extra fields
 # if they do, pydantic raises an exception.
 # use this for models we rely upon and cannot change.
@@ -35,14 +83,14 @@ HexBytes = Annotated[bytes, BeforeValidator(validate_hex_bytes)]
 # for things that may be extended and we don't care,
 # use FlexibleModel.
 class ExactModel(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+    model_config = ConfigDict(extra="forbid", defer_build=True)
 
 
 # a model that can have extra fields that we ignore.
 # use this if we don't want to raise an exception for extra
 # data fields that we didn't expect.
 class FlexibleModel(BaseModel):
-    pass
+    model_config = ConfigDict(defer_build=True)
 
 
 # use this type to indicate that we won't model this data.
@@ -208,6 +256,62 @@ class PE(ExactModel):
     guest_signers: Signer
 
 
+class StringTable(Sequence):
+    """
+    a list of strings packed into a single UTF-8 encoded buffer.
+
+    a report may contain hundreds of thousands of short strings,
+    and each Python str carries dozens of bytes of overhead,
+    so we store them back-to-back and decode each string when it's accessed.
+    """
+
+    __slots__ = ("_buf", "_offsets")
+
+    def __init__(self, strings: Iterable[str]):
+        # surrogatepass: JSON may contain lone surrogates, like "\ud800", which strict UTF-8 rejects.
+        buf = bytearray()
+        # the start offset of each string, plus the end offset of the last string.
+        self._offsets = array.array("Q", [0])
+        for s in strings:
+            buf += s.encode("utf-8", "surrogatepass")
+            self._offsets.append(len(buf))
+        self._buf = bytes(buf)
+
+    def _get(self, index: int) -> str:
+        return self._buf[self._offsets[index] : self._offsets[index + 1]].decode("utf-8", "surrogatepass")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string index out of range")
+        return self._get(index)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def __eq__(self, other):
+        if isinstance(other, StringTable):
+            return self._buf == other._buf and self._offsets == other._offsets
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: GetCoreSchemaHandler) -> CoreSchema:
+        return core_schema.no_info_after_validator_function(
+            cls,
+            core_schema.list_schema(core_schema.str_schema()),
+            serialization=core_schema.plain_serializer_function_ser_schema(list),
+        )
+
+
 # TODO(mr-tz): target.file.dotnet, target.file.extracted_files, target.file.extracted_files_tool,
 #  target.file.extracted_files_time
 # https://github.com/mandiant/capa/issues/1814
@@ -244,7 +348,7 @@ class File(FlexibleModel):
     ep_bytes: Optional[HexBytes] = None
     entrypoint: Optional[int] = None
     data: Optional[str] = None
-    strings: Optional[List[str]] = None
+    strings: Optional[StringTable] = None
 
     #
     # detections (skip)
@@ -269,21 +373,28 @@ class ProcessFile(File):
     target_process: Optional[str] = None
 
 
-class Argument(ExactModel):
-    name: str
+# a single call may have many arguments, and a report may have millions of calls,
+# so this is a (validated) NamedTuple rather than a model, which is much more compact.
+# like an ExactModel, pydantic rejects missing and unexpected fields.
+class Argument(NamedTuple):
+    name: InternedStr
     # unsure why empty list is provided here
     value: Union[HexInt, int, str, EmptyList]
     pretty_value: Optional[str] = None
 
 
+# note: although there may be millions of calls,
+# checking each for extra fields (ExactModel) has no measurable cost compared to FlexibleModel,
+# so we keep the check to detect changes to the call format.
 class Call(ExactModel):
     timestamp: str
     thread_id: int
-    category: str
+    category: InternedStr
 
-    api: str
+    api: InternedStr
 
-    arguments: List[Argument]
+    # serialize arguments as objects, like the report (and previous versions of this model) does, not as lists.
+    arguments: List[Annotated[Argument, PlainSerializer(Argument._asdict)]]
     status: bool
     return_: HexInt = Field(alias="return")
     pretty_return: Optional[str] = None
@@ -298,18 +409,154 @@ class Call(ExactModel):
     id: int
 
 
+# when set, trust that calls are well-formed and construct them without pydantic validation.
+# this is faster, but unexpected fields are silently ignored,
+# so it's opt-in via the environment variable CAPA_FAST_CALL=1.
+FAST_CALL = os.environ.get("CAPA_FAST_CALL") not in ("0", "no", "NO", "n", None)
+
+
+def _validate_argument_value(value):
+    # mirror the Argument.value union: prefer (hex) integers, then strings, then the empty list.
+    if isinstance(value, str):
+        try:
+            return validate_hex_int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def construct_call(doc: Dict[str, Any]) -> Call:
+    """
+    construct a Call from the given raw call, specialized to the known field layout,
+    without going through the generic pydantic validation.
+
+    falls back to full validation when the raw call doesn't have the expected shape,
+    so that errors are reported as usual.
+    """
+    try:
+        return Call.model_construct(
+            timestamp=doc["timestamp"],
+            thread_id=int(doc["thread_id"]),
+            category=sys.intern(doc["category"]),
+            api=sys.intern(doc["api"]),
+            arguments=[
+                Argument(
+                    sys.intern(arg["name"]),
+                    _validate_argument_value(arg["value"]),
+                    arg.get("pretty_value"),
+                )
+                for arg in doc["arguments"]
+            ],
+            status=doc["status"],
+            return_=validate_hex_int(doc["return"]),
+            pretty_return=doc.get("pretty_return"),
+            repeated=doc["repeated"],
+            caller=validate_hex_int(doc["caller"]),
+            parentcaller=validate_hex_int(doc["parentcaller"]),
+            id=doc["id"],
+        )
+    except (KeyError, TypeError, ValueError):
+        return Call.model_validate(doc)
+
+
+class LazyCallList(Sequence):
+    """
+    a list of API calls that are validated upon first access.
+
+    a process may have hundreds of thousands of calls,
+    so, we hold onto the raw call data and validate each call when it's accessed,
+    replacing the raw data with the resulting Call, so each call is validated at most once.
+    this makes loading a report cheap for callers that only inspect some calls (or none at all).
+
+    note that capa's own analysis walks every call of a process for each thread,
+    so every call is still validated, just during analysis rather than while loading.
+    this also means a malformed call raises a ValidationError when it's accessed,
+    not when the report is loaded.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: List[Union[Dict[str, Any], "Call"]]):
+        self._items = items
+
+    def _get(self, index: int) -> Call:
+        item = self._items[index]
+        if not isinstance(item, Call):
+            item = construct_call(item) if FAST_CALL else Call.model_validate(item)
+            self._items[index] = item
+        return item
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._items)))]
+        return self._get(index)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Call]:
+        for i in range(len(self._items)):
+            yield self._get(i)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyCallList):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: GetCoreSchemaHandler) -> CoreSchema:
+        return core_schema.no_info_after_validator_function(
+            cls,
+            core_schema.list_schema(),
+            serialization=core_schema.plain_serializer_function_ser_schema(list),
+        )
+
+
 class Process(ExactModel):
     process_id: int
-    process_name: str
+    process_name: InternedStr
     parent_id: int
-    module_path: str
+    module_path: InternedStr
     first_seen: str
-    calls: List[Call]
+    calls: LazyCallList
     threads: List[int]
     environ: Dict[str, str]
 
 
-class ProcessTree(ExactModel):
+# like pydantic's (lax) validation of int fields,
+# accept integers, integral floats, and strings of decimal digits.
+def _validate_int(value: Any) -> int:
+    if isinstance(value, int):
+        return int(value)
+    elif isinstance(value, float) and value.is_integer():
+        return int(value)
+    elif isinstance(value, str) and value.strip().lstrip("+-").isdigit():
+        return int(value)
+    else:
+        raise ValueError(f"expected an integer, not: {value!r:.80}")
+
+
+def _validate_str(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    else:
+        raise ValueError(f"expected a string, not: {value!r:.80}")
+
+
+@dataclass
+class ProcessTree:
+    """
+    a node in the tree of processes observed by the sandbox.
+
+    this is a plain (slotted) dataclass rather than a pydantic model,
+    because pydantic validates self-referential models recursively, node by node.
+    instead, `from_dict` builds the tree iteratively.
+    """
+
+    __slots__ = ("name", "pid", "parent_id", "module_path", "threads", "environ", "children")
+
     name: str
     pid: int
     parent_id: int
@@ -318,21 +565,78 @@ class ProcessTree(ExactModel):
     environ: Dict[str, str]
     children: List["ProcessTree"]
 
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> "ProcessTree":
+        fields = set(cls.__slots__)
+
+        root: Optional[ProcessTree] = None
+        # pairs of (raw node, parent node), children pushed in reverse so they're built in order.
+        stack: List[Tuple[Any, Optional[ProcessTree]]] = [(doc, None)]
+        while stack:
+            d, parent = stack.pop()
+
+            # like an ExactModel, require exactly the fields we know about.
+            if not isinstance(d, dict) or d.keys() != fields:
+                raise ValueError(f"unexpected process tree node: {d!r:.80}")
+
+            if not isinstance(d["threads"], list):
+                raise ValueError(f"unexpected process tree threads: {d['threads']!r:.80}")
+            if not isinstance(d["environ"], dict) or not all(
+                isinstance(k, str) and isinstance(v, str) for k, v in d["environ"].items()
+            ):
+                raise ValueError(f"unexpected process tree environ: {d['environ']!r:.80}")
+            if not isinstance(d["children"], list):
+                raise ValueError(f"unexpected process tree children: {d['children']!r:.80}")
+
+            node = cls(
+                name=_validate_str(d["name"]),
+                pid=_validate_int(d["pid"]),
+                parent_id=_validate_int(d["parent_id"]),
+                module_path=_validate_str(d["module_path"]),
+                threads=[_validate_int(tid) for tid in d["threads"]],
+                environ=dict(d["environ"]),
+                children=[],
+            )
+
+            if parent is None:
+                root = node
+            else:
+                parent.children.append(node)
+
+            stack.extend((child, node) for child in reversed(d["children"]))
+
+        assert root is not None
+        return root
+
+    @classmethod
+    def _validate(cls, value: Any) -> "ProcessTree":
+        if isinstance(value, ProcessTree):
+            return value
+        return cls.from_dict(value)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: GetCoreSchemaHandler) -> CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(dataclasses.asdict),
+        )
+
 
 class Summary(ExactModel):
-    files: List[str]
-    read_files: List[str]
-    write_files: List[str]
-    delete_files: List[str]
-    keys: List[str]
-    read_keys: List[str]
-    write_keys: List[str]
-    delete_keys: List[str]
-    executed_commands: List[str]
-    resolved_apis: List[str]
-    mutexes: List[str]
-    created_services: List[str]
-    started_services: List[str]
+    # capa only reads these, so use (immutable) tuples rather than lists.
+    files: Tuple[str, ...]
+    read_files: Tuple[str, ...]
+    write_files: Tuple[str, ...]
+    delete_files: Tuple[str, ...]
+    keys: Tuple[str, ...]
+    read_keys: Tuple[str, ...]
+    write_keys: Tuple[str, ...]
+    delete_keys: Tuple[str, ...]
+    executed_commands: Tuple[str, ...]
+    resolved_apis: Tuple[str, ...]
+    mutexes: Tuple[str, ...]
+    created_services: Tuple[str, ...]
+    started_services: Tuple[str, ...]
 
 
 class EncryptedBuffer(ExactModel):
@@ -377,6 +681,14 @@ class Cape(ExactModel):
     configs: Skip = None
 
 
+class SupportsRead(Protocol):
+    """
+    a binary file-like object, such as an open file or a gzip.GzipFile.
+    """
+
+    def read(self, size: int = -1) -> bytes: ...
+
+
 # flexible because there may be more sorts of analysis
 # but we only care about the ones described here.
 class CapeReport(FlexibleModel):
@@ -389,7 +701,7 @@ class CapeReport(FlexibleModel):
     # static analysis results
     #
     static: Optional[Static] = None
-    strings: Optional[List[str]] = None
+    strings: Optional[StringTable] = None
 
     #
     # dynamic analysis results
@@ -441,6 +753,103 @@ class CapeReport(FlexibleModel):
     # AV detections for the sample.
     virustotal: Skip = None
 
+    @classmethod
+    def from_dict(cls, doc: Dict[str, Any]) -> "CapeReport":
+        # drop the data we don't model before validation,
+        # so pydantic doesn't spend any time on it.
+        doc = {k: v for k, v in doc.items() if k not in SKIPPED_REPORT_FIELDS}
+        if isinstance(doc.get("behavior"), dict):
+            doc["behavior"] = {k: v for k, v in doc["behavior"].items() if k not in SKIPPED_BEHAVIOR_FIELDS}
+
+        # note: we validate the processes serially.
+        # pydantic-core holds the GIL while it builds Python objects from Python input,
+        # so validating processes across a thread pool isn't any faster,
+        # and since calls are validated lazily (see LazyCallList), processes are cheap anyway.
+        return cls.model_validate(doc)
+
     @classmethod
     def from_buf(cls, buf: bytes) -> "CapeReport":
-        return cls.model_validate_json(buf)
+        return cls.from_dict(capa.helpers.load_json(buf))
+
+    @classmethod
+    def from_path(cls, path: Path) -> "CapeReport":
+        """
+        load the (optionally gzip-compressed) report at the given path.
+        """
+        return cls.from_dict(capa.helpers.load_json_from_path(path))
+
+    @classmethod
+    def from_stream(cls, f: SupportsRead) -> "CapeReport":
+        """
+        load a report from the given file-like object containing the JSON document,
+        parsing it incrementally.
+
+        unlike the other constructors, this never holds the whole document,
+        nor the raw API calls, in memory: each call is validated as soon as it's been parsed,
+        and sections that we don't model are discarded while parsing.
+
+        requires the optional dependency `ijson`.
+        """
+        import ijson
+
+        process_prefix = "behavior.processes.item"
+        calls_prefix = process_prefix + ".calls"
+        call_prefix = calls_prefix + ".item"
+
+        def is_skipped(path: str) -> bool:
+            parts = path.split(".", 2)
+            if parts[0] in SKIPPED_REPORT_FIELDS:
+                return True
+            return len(parts) > 1 and parts[0] == "behavior" and parts[1] in SKIPPED_BEHAVIOR_FIELDS
+
+        # the document, except for the API calls, which are collected separately, by process index.
+        root = ijson.ObjectBuilder()
+        process_index = -1
+        process_calls: Dict[int, List[Union[Dict[str, Any], Call]]] = {}
+        # the call currently being parsed, if any.
+        call: Optional[ijson.ObjectBuilder] = None
+
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if call is None and prefix == call_prefix and event == "start_map":
+                call = ijson.ObjectBuilder()
+
+            if call is not None:
+                call.event(event, value)
+                if prefix == call_prefix and event == "end_map":
+                    validated = construct_call(call.value) if FAST_CALL else Call.model_validate(call.value)
+                    process_calls[process_index].append(validated)
+                    call = None
+                continue
+
+            path = prefix
+            if event == "map_key":
+                # the key itself belongs to the path it introduces.
+                path = f"{prefix}.{value}" if prefix else value
+            if is_skipped(path):
+                continue
+
+            if prefix == process_prefix and event == "start_map":
+                process_index += 1
+            elif prefix == calls_prefix and event == "start_array":
+                process_calls[process_index] = []
+
+            root.event(event, value)
+
+        doc = root.value
+        for index, calls in process_calls.items():
+            doc["behavior"]["processes"][index]["calls"] = calls
+
+        return cls.from_dict(doc)
+
+
+def get_skipped_fields(model: Type[BaseModel]) -> FrozenSet[str]:
+    """
+    get the names of the fields of the given model that are typed as `Skip`.
+    """
+    return frozenset(name for name, field in model.model_fields.items() if field.annotation == Skip)
+
+
+# note: we don't drop fields typed as TODO/ListTODO,
+# because we want pydantic to raise an error when they contain data.
+SKIPPED_REPORT_FIELDS = get_skipped_fields(CapeReport)
+SKIPPED_BEHAVIOR_FIELDS = get_skipped_fields(Behavior)
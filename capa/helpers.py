@@ -17,6 +17,12 @@ from pathlib import Path
 
 import tqdm
 
+try:
+    # orjson is optional, but parses large documents, like sandbox reports, much faster.
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 from capa.exceptions import UnsupportedFormatError
 from capa.features.common import (
     FORMAT_PE,
@@ -71,14 +77,35 @@ def assert_never(value) -> NoReturn:
     assert False, f"Unhandled value: {value} ({type(value).__name__})"  # noqa: B011
 
 
+def load_json(buf: bytes):
+    """
+    parse the given JSON document, using orjson when it's available.
+
+    orjson is stricter than the standard library: it rejects lone surrogates (like "\\ud800"),
+    which occur in sandbox string dumps, as well as NaN and out-of-range floats (like 1e400),
+    so we fall back to the standard library for such documents.
+
+    note: orjson parses integers outside the 64-bit range as (lossy) floats,
+    while the standard library returns exact integers.
+    CAPE reports encode addresses and other large values as hex strings, so this is acceptable.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(buf)
+        except orjson.JSONDecodeError:
+            logger.debug("failed to parse JSON document with orjson, falling back to json")
+
+    return json.loads(buf)
+
+
 def load_json_from_path(json_path: Path):
     with gzip.open(json_path, "r") as compressed_report:
         try:
             report_json = compressed_report.read()
         except gzip.BadGzipFile:
-            report = json.load(json_path.open(encoding="utf-8"))
+            report = load_json(json_path.read_bytes())
         else:
-            report = json.loads(report_json)
+            report = load_json(report_json)
     return report
 
 
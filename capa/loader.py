@@ -182,8 +182,12 @@ def get_extractor(
     should_save_workspace=False,
     disable_progress=False,
     sample_path: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
 ) -> FeatureExtractor:
     """
+    args:
+      cache_dir: when provided, cache validated CAPE reports in this directory.
+
     raises:
       UnsupportedFormatError
       UnsupportedArchError
@@ -196,8 +200,7 @@ def get_extractor(
     if backend == BACKEND_CAPE:
         import capa.features.extractors.cape.extractor
 
-        report = capa.helpers.load_json_from_path(input_path)
-        return capa.features.extractors.cape.extractor.CapeExtractor.from_report(report)
+        return capa.features.extractors.cape.extractor.CapeExtractor.from_path(input_path, cache_dir=cache_dir)
 
     elif backend == BACKEND_DOTNET:
         import capa.features.extractors.dnfile.extractor
@@ -286,7 +289,9 @@ def get_extractor(
         raise ValueError("unexpected backend: " + backend)
 
 
-def get_file_extractors(input_file: Path, input_format: str) -> List[FeatureExtractor]:
+def get_file_extractors(
+    input_file: Path, input_format: str, cache_dir: Optional[Path] = None
+) -> List[FeatureExtractor]:
     file_extractors: List[FeatureExtractor] = []
 
     # we use lazy importing here to avoid eagerly loading dependencies
@@ -313,8 +318,9 @@ def get_file_extractors(input_file: Path, input_format: str) -> List[FeatureExtr
     elif input_format == FORMAT_CAPE:
         import capa.features.extractors.cape.extractor
 
-        report = capa.helpers.load_json_from_path(input_file)
-        file_extractors.append(capa.features.extractors.cape.extractor.CapeExtractor.from_report(report))
+        file_extractors.append(
+            capa.features.extractors.cape.extractor.CapeExtractor.from_path(input_file, cache_dir=cache_dir)
+        )
 
     return file_extractors
 
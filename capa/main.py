@@ -605,6 +605,19 @@ def get_rules_from_cli(args) -> RuleSet:
     return rules
 
 
+def get_report_cache_dir_from_cli() -> Optional[Path]:
+    """
+    get the directory in which to cache validated sandbox reports,
+    or None when report caching is disabled (the default), since cached reports may be large.
+
+    enable report caching by setting the environment variable CAPA_CACHE_REPORTS=1.
+    """
+    if os.environ.get("CAPA_CACHE_REPORTS") in ("0", "no", "NO", "n", None):
+        return None
+
+    return capa.rules.cache.get_default_cache_directory()
+
+
 def get_file_extractors_from_cli(args, input_format: str) -> List[FeatureExtractor]:
     """
     args:
@@ -622,7 +635,7 @@ def get_file_extractors_from_cli(args, input_format: str) -> List[FeatureExtract
     # this pass can inspect multiple file extractors, e.g., dotnet and pe to identify
     # various limitations
     try:
-        return capa.loader.get_file_extractors(args.input_file, input_format)
+        return capa.loader.get_file_extractors(args.input_file, input_format, cache_dir=get_report_cache_dir_from_cli())
     except PEFormatError as e:
         logger.error("Input file '%s' is not a valid PE file: %s", args.input_file, str(e))
         raise ShouldExitError(E_CORRUPT_FILE) from e
@@ -740,6 +753,7 @@ def get_extractor_from_cli(args, input_format: str, backend: str) -> FeatureExtr
             should_save_workspace=should_save_workspace,
             disable_progress=args.quiet or args.debug,
             sample_path=sample_path,
+            cache_dir=get_report_cache_dir_from_cli(),
         )
     except UnsupportedFormatError as e:
         if input_format == FORMAT_CAPE:
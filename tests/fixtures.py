@@ -191,12 +191,9 @@ def get_binja_extractor(path: Path):
 
 @lru_cache(maxsize=1)
 def get_cape_extractor(path):
-    from capa.helpers import load_json_from_path
     from capa.features.extractors.cape.extractor import CapeExtractor
 
-    report = load_json_from_path(path)
-
-    return CapeExtractor.from_report(report)
+    return CapeExtractor.from_path(path)
 
 
 @lru_cache(maxsize=1)
@@ -5,15 +5,28 @@
 # Unless required by applicable law or agreed to in writing, software distributed under the License
 #  is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and limitations under the License.
+import io
 import gzip
+import json
 from typing import Type
 from pathlib import Path
 
 import pytest
 import fixtures
+import pydantic
 
+import capa.features.extractors.cape.cache
 from capa.exceptions import EmptyReportError, UnsupportedFormatError
-from capa.features.extractors.cape.models import Call, CapeReport
+from capa.features.extractors.cape.models import (
+    Call,
+    HexInt,
+    Process,
+    CapeReport,
+    ProcessTree,
+    StringTable,
+    LazyCallList,
+    construct_call,
+)
 
 CD = Path(__file__).resolve().parent
 CAPE_DIR = CD / "data" / "dynamic" / "cape"
@@ -43,6 +56,65 @@ def test_cape_model_can_load(version: str, filename: str):
     report = CapeReport.from_buf(buf)
     assert report is not None
 
+    report = CapeReport.from_path(path)
+    assert report is not None
+
+
+@fixtures.parametrize(
+    "version,filename",
+    [
+        ("v2.2", "0000a65749f5902c4d82ffa701198038f0b4870b00a27cfca109f8f933476d82.json.gz"),
+        ("v2.4", "fb7ade52dc5a1d6128b9c217114a46d0089147610f99f5122face29e429a1e74.json.gz"),
+    ],
+)
+def test_cape_model_can_load_stream(version: str, filename: str):
+    pytest.importorskip("ijson")
+
+    path = CAPE_DIR / version / filename
+    with gzip.open(path, "rb") as f:
+        report = CapeReport.from_stream(f)
+
+    assert report.model_dump() == CapeReport.from_path(path).model_dump()
+
+
+@fixtures.parametrize(
+    "version,filename",
+    [
+        ("v2.2", "0000a65749f5902c4d82ffa701198038f0b4870b00a27cfca109f8f933476d82.json.gz"),
+    ],
+)
+def test_cape_model_cache(version: str, filename: str, tmp_path: Path):
+    path = CAPE_DIR / version / filename
+    id = capa.features.extractors.cape.cache.compute_cache_identifier(path)
+    assert capa.features.extractors.cape.cache.load_cached_report(tmp_path, id) is None
+
+    report = capa.features.extractors.cape.cache.load_report(path, tmp_path)
+    assert capa.features.extractors.cape.cache.get_cache_path(tmp_path, id).exists()
+
+    cached = capa.features.extractors.cape.cache.load_cached_report(tmp_path, id)
+    assert cached is not None
+    assert cached.model_dump() == report.model_dump()
+
+    # no temporary files are left behind
+    assert list(tmp_path.iterdir()) == [capa.features.extractors.cape.cache.get_cache_path(tmp_path, id)]
+
+    # invalid cache entries are discarded
+    cache_path = capa.features.extractors.cape.cache.get_cache_path(tmp_path, id)
+    buf = cache_path.read_bytes()
+    cache_path.write_bytes(b"invalid")
+    assert capa.features.extractors.cape.cache.load_cached_report(tmp_path, id) is None
+    assert not cache_path.exists()
+
+    # as are truncated cache entries
+    cache_path.write_bytes(buf[: len(buf) // 2])
+    assert capa.features.extractors.cape.cache.load_cached_report(tmp_path, id) is None
+    assert not cache_path.exists()
+
+    # and the report is then loaded and cached again
+    report = capa.features.extractors.cape.cache.load_report(path, tmp_path)
+    assert report.model_dump() == cached.model_dump()
+    assert cache_path.exists()
+
 
 @fixtures.parametrize(
     "version,filename,exception",
@@ -73,6 +145,146 @@ def test_cape_extractor(version: str, filename: str, exception: Type[BaseExcepti
         assert cr is not None
 
 
+def make_report(**kwargs):
+    summary_fields = (
+        "files",
+        "read_files",
+        "write_files",
+        "delete_files",
+        "keys",
+        "read_keys",
+        "write_keys",
+        "delete_keys",
+        "executed_commands",
+        "resolved_apis",
+        "mutexes",
+        "created_services",
+        "started_services",
+    )
+    report = {
+        "target": {
+            "category": "file",
+            "file": {
+                "type": "PE32 executable (GUI) Intel 80386, for MS Windows",
+                "name": "sample.exe",
+                "path": "/tmp/sample.exe",
+                "guest_paths": [],
+                "crc32": "",
+                "md5": "",
+                "sha1": "",
+                "sha256": "",
+                "sha512": "",
+                "ssdeep": "",
+                "size": 0,
+            },
+        },
+        "info": {"version": "2.4-CAPE"},
+        "behavior": {
+            "summary": {field: [] for field in summary_fields},
+            "processes": [],
+            "processtree": [],
+            "anomaly": [],
+            "encryptedbuffers": [],
+        },
+        "procmemory": [],
+        "malscore": 0.0,
+    }
+    report.update(kwargs)
+    return report
+
+
+def test_cape_model_skipped_fields():
+    # sections typed as Skip are dropped before validation, whatever they contain.
+    junk = {"junk": [object()]}
+    doc = make_report(network=junk, signatures=junk)
+    doc["behavior"]["enhanced"] = junk
+
+    report = CapeReport.from_dict(doc)
+    assert report.network is None
+    assert report.signatures is None
+    assert report.behavior.enhanced is None
+
+    # but fields that we haven't modeled yet must still be empty.
+    with pytest.raises(pydantic.ValidationError):
+        CapeReport.from_dict(make_report(procmemory=[{"pid": 1000}]))
+
+
+def make_call(**kwargs):
+    call = {
+        "timestamp": "2023-10-20 12:30:14,015",
+        "thread_id": 2380,
+        "caller": "0x7797dff8",
+        "parentcaller": "0x77973486",
+        "category": "system",
+        "api": "TestApiCall",
+        "status": True,
+        "return": "0x00000000",
+        "arguments": [{"name": "Value Base 16", "value": "0x30"}],
+        "repeated": 0,
+        "id": 0,
+    }
+    call.update(kwargs)
+    return call
+
+
+def make_process(pid, calls):
+    return {
+        "process_id": pid,
+        "process_name": "sample.exe",
+        "parent_id": 999,
+        "module_path": "C:\\sample.exe",
+        "first_seen": "2023-10-20 12:30:14,015",
+        "calls": calls,
+        "threads": [2380],
+        "environ": {},
+    }
+
+
+def test_cape_model_stream():
+    pytest.importorskip("ijson")
+
+    doc = make_report(network={"junk": [1, 2, 3]})
+    doc["behavior"]["processes"] = [
+        make_process(1000, [make_call(), make_call()]),
+        make_process(1001, []),
+        make_process(1002, [make_call()]),
+    ]
+    buf = json.dumps(doc).encode("utf-8")
+
+    report = CapeReport.from_stream(io.BytesIO(buf))
+    assert [len(process.calls) for process in report.behavior.processes] == [2, 0, 1]
+    assert report.network is None
+    assert report == CapeReport.from_buf(buf)
+
+
+def test_cape_model_cache_synthetic(tmp_path: Path, monkeypatch):
+    doc = make_report()
+    doc["behavior"]["processes"] = [make_process(1000, [make_call(), make_call()])]
+    path = tmp_path / "report.json.gz"
+    path.write_bytes(gzip.compress(json.dumps(doc).encode("utf-8")))
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+
+    report = capa.features.extractors.cape.cache.load_report(path, cache_dir)
+    assert report == CapeReport.from_path(path)
+
+    # the cache holds validated calls, so they're not validated again upon access.
+    id = capa.features.extractors.cape.cache.compute_cache_identifier(path)
+    cached = capa.features.extractors.cape.cache.load_cached_report(cache_dir, id)
+    assert cached is not None
+    assert all(isinstance(call, Call) for call in cached.behavior.processes[0].calls._items)
+
+    # failing to write the cache doesn't fail loading the report.
+    def write_bytes(self, data):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(Path, "write_bytes", write_bytes)
+    cache_dir = tmp_path / "read-only"
+    cache_dir.mkdir()
+    assert capa.features.extractors.cape.cache.load_report(path, cache_dir) == report
+    assert list(cache_dir.iterdir()) == []
+
+
 def test_cape_model_argument():
     call = Call.model_validate_json(
         """
@@ -102,3 +314,185 @@ def test_cape_model_argument():
     )
     assert call.arguments[0].value == 30
     assert call.arguments[1].value == 0x30
+
+    # arguments are serialized as objects, like in the report.
+    assert call.model_dump()["arguments"] == [
+        {"name": "Value Base 10", "value": 30, "pretty_value": None},
+        {"name": "Value Base 16", "value": 0x30, "pretty_value": None},
+    ]
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("0x30", 0x30),
+        ("30", 30),
+        (30, 30),
+        (True, 1),
+        (1.0, 1),
+    ],
+)
+def test_cape_model_hex_int(value, expected):
+    parsed: int = pydantic.TypeAdapter(HexInt).validate_python(value)
+    assert parsed == expected
+    assert isinstance(parsed, int) and not isinstance(parsed, bool)
+
+
+@pytest.mark.parametrize("value", [1.5, None, [], {}, b"30", "foo"])
+def test_cape_model_hex_int_invalid(value):
+    with pytest.raises(pydantic.ValidationError):
+        pydantic.TypeAdapter(HexInt).validate_python(value)
+
+
+def test_cape_model_construct_call():
+    doc = {
+        "timestamp": "2023-10-20 12:30:14,015",
+        "thread_id": "2380",
+        "caller": "0x7797dff8",
+        "parentcaller": "0x77973486",
+        "category": "system",
+        "api": "TestApiCall",
+        "status": True,
+        "return": "0x00000000",
+        "arguments": [
+            {"name": "Value Base 10", "value": "30"},
+            {"name": "Value Base 16", "value": "0x30"},
+            {"name": "Value String", "value": "foo", "pretty_value": "bar"},
+            {"name": "Value Empty", "value": []},
+        ],
+        "repeated": 19,
+        "id": 0,
+    }
+    assert construct_call(doc).model_dump() == Call.model_validate(doc).model_dump()
+
+    # malformed calls still raise validation errors.
+    with pytest.raises(pydantic.ValidationError):
+        construct_call({"invalid": "call"})
+
+
+def test_cape_model_lazy_calls():
+    process = Process.model_validate(
+        {
+            "process_id": 1000,
+            "process_name": "sample.exe",
+            "parent_id": 999,
+            "module_path": "C:\\sample.exe",
+            "first_seen": "2023-10-20 12:30:14,015",
+            "calls": [
+                {
+                    "timestamp": "2023-10-20 12:30:14,015",
+                    "thread_id": 2380,
+                    "caller": "0x7797dff8",
+                    "parentcaller": "0x77973486",
+                    "category": "system",
+                    "api": "TestApiCall",
+                    "status": True,
+                    "return": "0x00000000",
+                    "arguments": [],
+                    "repeated": 0,
+                    "id": 0,
+                },
+                {"invalid": "call"},
+            ],
+            "threads": [2380],
+            "environ": {},
+        }
+    )
+    assert len(process.calls) == 2
+
+    # calls are validated upon access, and then cached.
+    assert process.calls[0].caller == 0x7797DFF8
+    assert process.calls[0] is process.calls[0]
+
+    with pytest.raises(pydantic.ValidationError):
+        _ = process.calls[1]
+
+
+def test_cape_model_lazy_calls_equality():
+    call = {
+        "timestamp": "2023-10-20 12:30:14,015",
+        "thread_id": 2380,
+        "caller": "0x7797dff8",
+        "parentcaller": "0x77973486",
+        "category": "system",
+        "api": "TestApiCall",
+        "status": True,
+        "return": "0x00000000",
+        "arguments": [],
+        "repeated": 0,
+        "id": 0,
+    }
+
+    calls = LazyCallList([dict(call)])
+    assert calls == LazyCallList([dict(call)])
+    assert calls == [Call.model_validate(call)]
+    assert calls != LazyCallList([])
+
+
+def make_process_tree_node(**kwargs):
+    node = {
+        "name": "sample.exe",
+        "pid": 1000,
+        "parent_id": 999,
+        "module_path": "C:\\sample.exe",
+        "threads": ["2380"],
+        "environ": {"UserName": "user"},
+        "children": [],
+    }
+    node.update(kwargs)
+    return node
+
+
+def test_cape_model_process_tree():
+    tree: ProcessTree = pydantic.TypeAdapter(ProcessTree).validate_python(
+        make_process_tree_node(
+            children=[
+                make_process_tree_node(pid=1001, parent_id=1000, children=[make_process_tree_node(pid=1003)]),
+                make_process_tree_node(pid=1002, parent_id=1000),
+            ]
+        )
+    )
+    assert tree.pid == 1000
+    assert tree.threads == [2380]
+    assert [child.pid for child in tree.children] == [1001, 1002]
+    assert tree.children[0].children[0].pid == 1003
+
+
+@pytest.mark.parametrize(
+    "node",
+    [
+        make_process_tree_node(pid=None),
+        make_process_tree_node(pid=1.7),
+        make_process_tree_node(pid="foo"),
+        make_process_tree_node(module_path=5),
+        make_process_tree_node(threads=None),
+        make_process_tree_node(environ=[["k", "v"]]),
+        make_process_tree_node(environ={"k": 1}),
+        make_process_tree_node(children=None),
+        make_process_tree_node(children=[make_process_tree_node(name=None)]),
+        make_process_tree_node(extra=True),
+    ],
+)
+def test_cape_model_process_tree_invalid(node):
+    with pytest.raises(pydantic.ValidationError):
+        pydantic.TypeAdapter(ProcessTree).validate_python(node)
+
+
+def test_cape_model_string_table():
+    strings = ["foo", "", "b\u00e4r", "\ud800"]
+
+    table = StringTable(strings)
+    assert len(table) == 4
+    assert list(table) == strings
+    assert table[2] == "b\u00e4r"
+    assert table[-1] == "\ud800"
+    assert table[1:3] == ["", "b\u00e4r"]
+    with pytest.raises(IndexError):
+        table[4]
+
+    assert len(StringTable([])) == 0
+
+    assert table == StringTable(strings)
+    assert table == strings
+    assert table != StringTable(["foo", "b\u00e4r"])
+    assert table != StringTable(["foob\u00e4r"])
@@ -6,8 +6,12 @@
 #  is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and limitations under the License.
 
+import math
 import codecs
 
+import pytest
+
+import capa.helpers
 from capa.features.extractors import helpers
 
 
@@ -64,3 +68,35 @@ def test_generate_symbols():
     symbols = list(helpers.generate_symbols("ws2_32", "#1", include_dll=False))
     assert len(symbols) == 1
     assert "ws2_32.#1" in symbols
+
+
+@pytest.fixture(params=["orjson", "json"])
+def json_backend(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(capa.helpers, "orjson", None)
+    return request.param
+
+
+def test_load_json_lone_surrogate(json_backend):
+    assert capa.helpers.load_json(b'["\\ud800"]') == ["\ud800"]
+
+
+def test_load_json_nan(json_backend):
+    assert math.isnan(capa.helpers.load_json(b"[NaN]")[0])
+
+
+def test_load_json_infinity(json_backend):
+    assert capa.helpers.load_json(b"[1e400]") == [math.inf]
+
+
+def test_load_json_large_int(json_backend):
+    assert capa.helpers.load_json(b"[18446744073709551615]") == [0xFFFFFFFFFFFFFFFF]
+
+    # orjson parses integers beyond 64 bits as floats, losing precision.
+    value = capa.helpers.load_json(b"[18446744073709551617]")[0]
+    if json_backend == "orjson":
+        assert value == float(0x10000000000000001)
+    else:
+        assert value == 0x10000000000000001